@@ -8,15 +8,19 @@ Robust to duplicate 'frequency' columns and non-positive/NaN rows.
 import sys, argparse, math
 from pathlib import Path
 import numpy as np
-import matplotlib.pyplot as plt
+from plot_helpers import decimate_idx, lower_index, pyplot as _pyplot
 
 def read_wrdata(p: Path):
     """Read ngspice WRDATA (ascii) into dict of column_name -> np.array."""
-    text = p.read_text(errors='ignore').strip().splitlines()
-    if not text:
+    # peek the first non-blank line; everything after it is parsed in C
+    hdr, skip = [], 0
+    with open(p, errors='ignore') as fh:
+        for line in fh:
+            skip += 1
+            hdr = line.split()
+            if hdr: break
+    if not hdr:
         raise ValueError(f"empty WRDATA: {p}")
-    # try header:
-    hdr = text[0].split()
     # If header looks like numeric first token, synthesize names
     def _isnum(s):
         try: float(s); return True
@@ -24,23 +28,33 @@ def read_wrdata(p: Path):
     if _isnum(hdr[0]):
         # synthesize col0, col1, ...
         names = [f"col{i}" for i in range(len(hdr))]
-        rows  = [list(map(float, line.split())) for line in text]
+        skip -= 1
     else:
         names = hdr
-        rows  = []
-        for line in text[1:]:
-            if not line.strip(): continue
-            parts = line.split()
-            # pad/trim to header length
-            if len(parts) < len(names):
-                parts += ['nan']*(len(names)-len(parts))
-            elif len(parts) > len(names):
-                parts = parts[:len(names)]
-            rows.append([float(x) if x not in ('nan','NaN') else float('nan') for x in parts])
-
-    arr = np.array(rows, dtype=float)
+
+    try:
+        arr = np.loadtxt(p, dtype=np.float64, skiprows=skip, ndmin=2)
+    except ValueError:
+        # ragged rows: fall back to per-line parsing, pad/trim to header length.
+        # Count the rows first so the matrix is allocated once, NaN-padded.
+        with open(p, errors='ignore') as fh:
+            nrows = sum(1 for i, line in enumerate(fh) if i >= skip and line.strip())
+        arr = np.full((nrows, len(names)), np.nan)
+        r = 0
+        with open(p, errors='ignore') as fh:
+            for i, line in enumerate(fh):
+                if i < skip or not line.strip(): continue
+                parts = line.split()[:len(names)]
+                arr[r, :len(parts)] = [float(x) for x in parts]
+                r += 1
+    if arr.shape[1] < len(names):
+        pad = np.full((arr.shape[0], len(names)-arr.shape[1]), np.nan)
+        arr = np.hstack([arr, pad])
+    elif arr.shape[1] > len(names):
+        arr = arr[:, :len(names)]
+
     cols = {}
-    # handle duplicate header tokens by suffixing _# and also keep first occurrence plain
+    # handle duplicate header tokens by suffixing _#: frequency, frequency_1, ...
     seen = {}
     for j, nm in enumerate(names):
         nm_clean = nm.strip()
@@ -52,16 +66,13 @@ def read_wrdata(p: Path):
             seen[nm_clean] = 0
             nm_key = nm_clean
         cols[nm_key] = arr[:, j]
-        # Also store the first occurrence under the bare name
-        if seen[nm_clean] == 0:
-            cols[nm_clean] = arr[:, j]
     return cols
 
 def pick_frequency(cols: dict, prefer=("frequency","freq","Frequency","frequency_1","frequency_2")):
     """Choose a frequency column that has finite, strictly positive values."""
     candidates = [k for k in cols.keys() if k.lower().startswith("frequency") or k.lower()=="freq"]
-    # preserve preference order
-    ordered = list(prefer) + [k for k in candidates if k not in prefer]
+    # preserve preference order, each key tried once
+    ordered = dict.fromkeys((*prefer, *candidates))
     for k in ordered:
         if k in cols:
             f = np.asarray(cols[k], float)
@@ -74,23 +85,18 @@ def pick_frequency(cols: dict, prefer=("frequency","freq","Frequency","frequency
             return k
     raise KeyError("no suitable positive frequency column found")
 
-def getcol(cols, name, alts=()):
+def getcol(cols, name, alts=(), lower=None):
     """Fetch column by exact name or case-insensitive match; try alternatives."""
-    keys = list(cols.keys())
-    if name in cols: return cols[name]
-    lname = name.lower()
-    for k in keys:
-        if k.lower() == lname: return cols[k]
-    for a in alts:
-        if a in cols: return cols[a]
-        for k in keys:
-            if k.lower() == a.lower(): return cols[k]
+    if lower is None:
+        lower = lower_index(cols)
+    for nm in (name, *alts):
+        if nm in cols: return cols[nm]
+        k = lower.get(nm.lower())
+        if k is not None: return cols[k]
     raise KeyError(f"column not found: {name}")
 
-def cmplx(re, im):
-    return np.asarray(re, float) + 1j*np.asarray(im, float)
-
 def save_svg(fig, path):
+    plt = _pyplot()
     fig.tight_layout()
     fig.savefig(path, format="svg")
     plt.close(fig)
@@ -119,10 +125,11 @@ def main():
         sys.exit(f"ERROR: {e}. Available={list(cols.keys())}")
 
     # get vectors (allow a few aliases just in case)
-    Ar = getcol(cols, args.an, ("re:real(v(in))","real(v(in))","re(v(in))","col3"))
-    Ai = getcol(cols, args.ai, ("im:imag(v(in))","imag(v(in))","im(v(in))","col4"))
-    Br = getcol(cols, args.bn, ("real(i(vsig))","re(i(vsig))","real(@vsig[i])","re(@vsig[i])","col5","col7"))
-    Bi = getcol(cols, args.bi, ("imag(i(vsig))","im(i(vsig))","imag(@vsig[i])","im(@vsig[i])","col6","col8"))
+    lower = lower_index(cols)
+    Ar = getcol(cols, args.an, ("re:real(v(in))","real(v(in))","re(v(in))","col3"), lower)
+    Ai = getcol(cols, args.ai, ("im:imag(v(in))","imag(v(in))","im(v(in))","col4"), lower)
+    Br = getcol(cols, args.bn, ("real(i(vsig))","re(i(vsig))","real(@vsig[i])","re(@vsig[i])","col5","col7"), lower)
+    Bi = getcol(cols, args.bi, ("imag(i(vsig))","im(i(vsig))","imag(@vsig[i])","im(@vsig[i])","col6","col8"), lower)
 
     f  = np.asarray(cols[kf], float)
     Ar = np.asarray(Ar, float)
@@ -139,14 +146,25 @@ def main():
         f = np.array([1.0, 10.0])
         Ar = Ai = Br = Bi = np.zeros_like(f)
 
-    A = cmplx(Ar, Ai)
-    B = cmplx(Br, Bi)
-    # avoid divide-by-zero
-    H = A / np.where(np.abs(B) > 1e-30, B, 1e-30)
-
-    mag = 20*np.log10(np.maximum(np.abs(H), 1e-15))
-    ph  = np.unwrap(np.angle(H)) * (180/np.pi)
-
+    # H = A/B on the split real/imag arrays (no complex temporaries);
+    # substitute B = 1e-30 where |B| <= 1e-30 (not just the denominator), so
+    # zero current reads as a huge impedance rather than zero
+    denom = Br*Br + Bi*Bi
+    small = denom <= 1e-60
+    Br = np.where(small, 1e-30, Br); Bi = np.where(small, 0.0, Bi)
+    denom[small] = 1e-60
+    Hr = (Ar*Br + Ai*Bi)/denom
+    Hi = (Ai*Br - Ar*Bi)/denom
+
+    # 10*log10(|H|^2) == 20*log10(|H|), minus the sqrt
+    mag = 10*np.log10(np.maximum(Hr*Hr + Hi*Hi, 1e-30))
+    ph  = np.unwrap(np.arctan2(Hi, Hr) / (2*np.pi), period=1.0) * 360.0  # in cycles: exact wrap counts
+
+    # an SVG can't show more points than this; unwrap above ran on the full sweep
+    idx = decimate_idx(f.size)
+    f, mag, ph = f[idx], mag[idx], ph[idx]
+
+    plt = _pyplot()
     fig = plt.figure(figsize=(3.25 if args.ieee else 8, 2.2 if args.ieee else 3))
     if args.title: plt.title(args.title)
     plt.semilogx(f, mag)
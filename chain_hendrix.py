@@ -2,112 +2,115 @@
 import argparse, os
 import numpy as np
 import soundfile as sf
-from scipy.signal import butter, sosfilt
+from scipy.signal import lfilter
+from tape_delay import tape_echo as _tape_echo
+from tv_kernels import allpass_tv_kernel as _allpass_tv_kernel, tv_biquad_kernel as _tv_biquad_kernel
 
 SR = 48000
 
 # ---------- utils ----------
 def norm(x):
-    m = np.max(np.abs(x)) + 1e-12
-    return (x / m).astype(np.float32)
+    # float32 out, whatever comes in: audio never needs float64's precision
+    x = np.asarray(x, dtype=np.float32)
+    return x * np.float32(1.0/(np.max(np.abs(x)) + 1e-12))
+
+def _norm_inplace(y):
+    # peak-normalize float32 y without allocating an |y| temporary
+    m = max(y.max(), -y.min()) if y.size else 0.0
+    y *= np.float32(1.0/(m + 1e-12))
+    return y
 
 def load_wav(path):
-    x, sr = sf.read(path, always_2d=False)
-    if x.ndim > 1: x = x[:,0]
+    x, sr = sf.read(path, dtype="float32", always_2d=False)
+    if x.ndim > 1: x = np.ascontiguousarray(x[:,0])
     if sr != SR:
         raise ValueError(f"Expected {SR} Hz; got {sr}. Resample first.")
-    return x.astype(np.float32)
+    return x
 
 def save_wav(path, x):
     os.makedirs(os.path.dirname(path), exist_ok=True)
     sf.write(path, norm(x), SR, subtype="PCM_24")
 
 def guitarish_note(freq=220.0, dur=2.0):
-    t = np.linspace(0, dur, int(SR*dur), endpoint=False)
-    x = (np.sin(2*np.pi*freq*t)
-         + 0.25*np.sin(2*np.pi*2*freq*t)
-         + 0.15*np.sin(2*np.pi*3*freq*t))
-    env = 1 - np.exp(-t*50)
+    n = np.arange(int(SR*dur))
+    # wrap the phase to one cycle first so float32 keeps full precision
+    phi = (2*np.pi*np.mod((freq/SR)*n, 1.0)).astype(np.float32)
+    # harmonics from one sin + one cos: sin 2φ = 2 sin φ cos φ, sin 3φ = 3 sin φ - 4 sin³φ
+    s1 = np.sin(phi)
+    s2 = 2*s1*np.cos(phi)
+    s3 = s1*(3 - 4*s1*s1)
+    x = s1 + 0.25*s2 + 0.15*s3
+    env = 1 - np.exp(-n*np.float32(50.0/SR), dtype=np.float32)
     return norm(x * env * 0.6)
 
 # ---------- building blocks ----------
 def lp_pre_emphasis(x, fc=3500.0):
     rc = 1/(2*np.pi*fc); alpha = np.exp(-1/(SR*rc))
-    y = np.copy(x)
-    for n in range(1, len(y)):
-        y[n] = alpha*y[n-1] + (1-alpha)*x[n]
-    return y
+    x = np.asarray(x, dtype=np.float32)  # lfilter keeps the input dtype
+    return lfilter(np.float32([1.0-alpha]), np.float32([1.0, -alpha]), x)
 
 def fuzz(x, drive=8.0, hard=0.45):
     y = lp_pre_emphasis(x, 3500)
-    soft = np.tanh(drive*y)
-    hardc = np.clip(drive*y, -0.6, 0.6)
-    return norm((1-hard)*soft + hard*hardc)
-
-def bandpass_sos(fc, q=2.5):
-    bw = fc/q
-    low = max(30.0, fc - bw/2.0)
-    high = min(SR/2 - 100.0, fc + bw/2.0)
-    return butter(2, [low/(SR/2), high/(SR/2)], btype='band', output='sos')
+    y *= np.float32(drive)
+    out = np.tanh(y); out *= np.float32(1-hard)
+    np.clip(y, -0.6, 0.6, out=y); y *= np.float32(hard)
+    out += y
+    return _norm_inplace(out)
 
 def wah_auto(x, f_lo=350, f_hi=2000, rate_hz=1.2, q=2.5):
     t = np.arange(len(x))/SR
     centers = f_lo + 0.5*(1+np.sin(2*np.pi*rate_hz*t))*(f_hi-f_lo)
-    y = np.zeros_like(x)
-    blk = 256
-    for i in range(0, len(x), blk):
-        sos = bandpass_sos(float(centers[i]), q=q)
-        y[i:i+blk] = sosfilt(sos, x[i:i+blk])
+    # RBJ band-pass (0 dB peak) coefficients for every sample, normalized by a0
+    w0 = 2*np.pi*centers/SR
+    alpha = np.sin(w0)/(2*q)
+    a0 = 1 + alpha
+    b0 = alpha/a0
+    a1 = -2*np.cos(w0)/a0
+    a2 = (1 - alpha)/a0
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    y = np.empty_like(x)
+    _tv_biquad_kernel(x, b0, np.zeros_like(b0), -b0, a1, a2, y)
     return norm(y)
 
 def univibe(x, rate_hz=4.0, depth=0.9):
     t = np.arange(len(x))/SR
     lfo = 0.6 + 0.4*np.sin(2*np.pi*rate_hz*t)
     bases = np.array([220, 440, 700, 1100], dtype=float)
-    y = x.copy()
-    def allpass(seg, fc, d=0.9):
-        w0 = 2*np.pi*fc/SR
-        a = (1 - np.sin(w0))/(1 + np.sin(w0))
-        out = np.zeros_like(seg); xm1=0.0; ym1=0.0
-        for n in range(len(seg)):
-            out[n] = -a*seg[n] + xm1 + a*ym1
-            xm1 = seg[n]; ym1 = out[n]
-        return (1-d)*seg + d*out
-    blk = 128
-    for base in bases:
-        z = np.zeros_like(y)
-        for i in range(0, len(y), blk):
-            z[i:i+blk] = allpass(y[i:i+blk], float(base*(0.5 + lfo[i])), depth)
+    # all-pass coefficients for every stage and sample, computed once
+    w0 = 2*np.pi*(bases[:,None]*(0.5 + lfo[None,:]))/SR
+    a = ((1 - np.sin(w0))/(1 + np.sin(w0))).astype(np.float32)
+    y = x.astype(np.float32)
+    for k in range(len(bases)):
+        z = np.empty_like(y)
+        _allpass_tv_kernel(y, a[k], np.float32(depth), z)
         y = z
-    y *= (0.9*(1 + 0.15*np.sin(2*np.pi*(rate_hz/2.0)*t)))
+    y *= (0.9*(1 + 0.15*np.sin(2*np.pi*(rate_hz/2.0)*t))).astype(np.float32)
     return norm(y)
 
 def octavia(x):
-    rect = np.abs(x)
-    y = np.tanh(6*(rect - 0.1))
-    return norm(y)
+    # one float32 buffer carried through rectify -> shape -> normalize
+    y = np.abs(x, dtype=np.float32)
+    y -= np.float32(0.1); y *= np.float32(6)
+    np.tanh(y, out=y)
+    return _norm_inplace(y)
 
 def leslie(x, rate_hz=5.5, dev_hz=3.0, am_depth=0.5):
     t = np.arange(len(x))/SR
-    am = 1 + am_depth*np.sin(2*np.pi*rate_hz*t)
-    fm = dev_hz*np.sin(2*np.pi*rate_hz*t)
+    lfo = np.sin(2*np.pi*rate_hz*t)  # shared by AM and FM
+    am = (1 + am_depth*lfo).astype(np.float32)
+    fm = dev_hz*lfo
     phase = 2*np.pi*np.cumsum(fm)/SR
     # crude FM around input: treat x's instantaneous phase as arctan(y/x) is overkill; use sine carrier
     fc = 330.0
-    y = am * np.sin(2*np.pi*fc*t + phase)
+    # carrier phase stays float64 (it grows without bound); the samples don't
+    y = np.sin(2*np.pi*fc*t + phase).astype(np.float32)
+    y *= am
     # Mix some original for realism
-    y = 0.6*y + 0.4*x
+    y *= np.float32(0.6); y += np.float32(0.4)*x
     return norm(y)
 
 def tape_echo(x, delay_ms=120, feedback=0.6, hf_loss=0.75):
-    d = int(SR*delay_ms/1000.0)
-    y = x.copy()
-    buf = np.zeros_like(x)
-    for n in range(d, len(x)):
-        prev = hf_loss*buf[n-d]
-        y[n] += feedback*prev
-        buf[n] = y[n]
-    return norm(y)
+    return norm(_tape_echo(x, delay_ms, feedback, hf_loss, sr=SR))
 
 EFFECTS = {
     'fuzz':      lambda x: fuzz(x),
@@ -1,18 +1,9 @@
 #!/usr/bin/env python3
-import argparse, numpy as np, matplotlib.pyplot as plt
+import argparse, numpy as np
+from tape_delay import tape_echo
 
 SR=48000
 
-def tape_echo(x, delay_ms=120, feedback=0.6, hf_loss=0.75):
-    d = int(SR*delay_ms/1000.0)
-    y = x.copy()
-    buf = np.zeros_like(x)
-    for n in range(d, len(x)):
-        prev = hf_loss*buf[n-d]
-        y[n] += feedback*prev
-        buf[n] = y[n]
-    return y
-
 def main():
     ap=argparse.ArgumentParser()
     ap.add_argument('--delay', type=float, default=120)
@@ -24,9 +15,13 @@ def main():
 
     N=int(SR*args.dur)
     x=np.zeros(N); x[0]=1.0  # unit impulse
-    y=tape_echo(x, args.delay, args.feedback, args.hf)
+    y=tape_echo(x, args.delay, args.feedback, args.hf, sr=SR)
 
     t=np.arange(min(N, int(SR*args.dur)))/SR
+    # deferred until there is something to draw; pyplot dominates startup
+    import matplotlib
+    matplotlib.use('Agg')  # SVG files only; skip GUI backend probing
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(8,3))
     plt.title(f"Tape Echo Impulse Response (delay {args.delay} ms, fb {args.feedback}, HF {args.hf})")
     plt.plot(t, y[:len(t)])
@@ -1,67 +1,84 @@
 #!/usr/bin/env python3
 import os, argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import soundfile as sf
+import matplotlib
+matplotlib.use('Agg')  # SVG files only; skip GUI backend probing
 import matplotlib.pyplot as plt
-from scipy.signal import butter, sosfilt
+from scipy.signal import lfilter
+from tape_delay import tape_echo as _tape_echo
+from tv_kernels import allpass_tv_kernel as _allpass_tv_kernel, tv_biquad_kernel as _tv_biquad_kernel
 
 SR = 48000  # sample rate
 
 # ---------- utils ----------
 def ensure_dir(d): os.makedirs(d, exist_ok=True)
-def norm(x): return x / (np.max(np.abs(x)) + 1e-12)
+def norm(x):
+    # float32 out, whatever comes in: audio never needs float64's precision
+    x = np.asarray(x, dtype=np.float32)
+    return x * np.float32(1.0/(np.max(np.abs(x)) + 1e-12))
+def _norm_inplace(y):
+    # peak-normalize float32 y without allocating an |y| temporary
+    m = max(y.max(), -y.min()) if y.size else 0.0
+    y *= np.float32(1.0/(m + 1e-12))
+    return y
 
 def save_audio(path, x):
-    x = norm(x).astype(np.float32)
-    sf.write(path, x, SR, subtype="PCM_24")
+    sf.write(path, norm(x), SR, subtype="PCM_24")
 
-def save_plot_time(path, x, ms=40, title=""):
+def save_fig(fig, path):
+    fig.tight_layout()
+    fig.savefig(path, format="svg", metadata={"Date": None})
+
+def save_plot_time(ax, fig, path, x, ms=40, title=""):
     n = int(SR * (ms/1000.0))
     t = np.arange(n)/SR*1000.0
-    plt.figure(figsize=(8,3))
-    if title: plt.title(title)
-    plt.plot(t, x[:n])
-    plt.xlabel("Time (ms)"); plt.ylabel("Amplitude")
-    plt.tight_layout()
-    plt.savefig(path); plt.close()
-
-def save_plot_fft(path, x, title=""):
+    ax.cla()
+    if title: ax.set_title(title)
+    ax.plot(t, x[:n])
+    ax.set_xlabel("Time (ms)"); ax.set_ylabel("Amplitude")
+    save_fig(fig, path)
+
+def save_plot_fft(ax, fig, path, x, title=""):
     N = 4096
     X = np.fft.rfft(np.hanning(N)*x[:N])
     f = np.fft.rfftfreq(N, 1/SR)
     mag = 20*np.log10(np.abs(X)+1e-12)
-    plt.figure(figsize=(8,3))
-    if title: plt.title(title)
-    plt.plot(f, mag)
-    plt.xlabel("Frequency (Hz)"); plt.ylabel("Magnitude (dBFS)")
-    plt.xlim(0, 6000)
-    plt.tight_layout()
-    plt.savefig(path); plt.close()
-
-def save_plot_spec(path, x, title=""):
-    plt.figure(figsize=(8,3))
-    if title: plt.title(title)
-    plt.specgram(x, NFFT=1024, Fs=SR, noverlap=768)
-    plt.xlabel("Time (s)"); plt.ylabel("Frequency (Hz)")
-    plt.tight_layout()
-    plt.savefig(path); plt.close()
+    ax.cla()
+    if title: ax.set_title(title)
+    ax.plot(f, mag)
+    ax.set_xlabel("Frequency (Hz)"); ax.set_ylabel("Magnitude (dBFS)")
+    ax.set_xlim(0, 6000)
+    save_fig(fig, path)
+
+def save_plot_spec(ax, fig, path, x, title=""):
+    ax.cla()
+    if title: ax.set_title(title)
+    ax.specgram(x, NFFT=1024, Fs=SR, noverlap=768)
+    ax.set_xlabel("Time (s)"); ax.set_ylabel("Frequency (Hz)")
+    save_fig(fig, path)
 
 # ---------- sources ----------
 def guitarish_note(freq=220.0, dur=2.0):
-    t = np.linspace(0, dur, int(SR*dur), endpoint=False)
-    x = (np.sin(2*np.pi*freq*t)
-         + 0.25*np.sin(2*np.pi*2*freq*t)
-         + 0.15*np.sin(2*np.pi*3*freq*t))
-    env = 1 - np.exp(-t*50)  # pick attack
+    n = np.arange(int(SR*dur))
+    # wrap the phase to one cycle first so float32 keeps full precision
+    phi = (2*np.pi*np.mod((freq/SR)*n, 1.0)).astype(np.float32)
+    # harmonics from one sin + one cos: sin 2φ = 2 sin φ cos φ, sin 3φ = 3 sin φ - 4 sin³φ
+    s1 = np.sin(phi)
+    s2 = 2*s1*np.cos(phi)
+    s3 = s1*(3 - 4*s1*s1)
+    x = s1 + 0.25*s2 + 0.15*s3
+    env = 1 - np.exp(-n*np.float32(50.0/SR), dtype=np.float32)  # pick attack
     return norm(x * env * 0.6)
 
 # ---------- effects ----------
 def compressor_soft(x, drive_db=12, knee="soft"):
     g = 10**(drive_db/20)
-    y = g*x
+    y = np.multiply(x, g, dtype=np.float32)
     if knee == "soft":
-        y = np.tanh(y)  # smooth saturation as poor-man’s soft knee
-    return norm(y)
+        np.tanh(y, out=y)  # smooth saturation as poor-man’s soft knee
+    return _norm_inplace(y)
 
 def hard_clip(x, th=0.6):
     return norm(np.clip(x, -th, th))
@@ -71,28 +88,28 @@ def fuzz_face_like(x):
     fc = 3500.0
     rc = 1/(2*np.pi*fc)
     alpha = np.exp(-1/(SR*rc))
-    y = np.copy(x)
-    for n in range(1, len(y)):
-        y[n] = alpha*y[n-1] + (1-alpha)*x[n]
+    x = np.asarray(x, dtype=np.float32)  # lfilter keeps the input dtype
+    y = lfilter(np.float32([1.0-alpha]), np.float32([1.0, -alpha]), x)
     gain = 8.0
-    soft = np.tanh(gain*y)
-    hard = np.clip(gain*y, -0.6, 0.6)
-    return norm(0.55*soft + 0.45*hard)
-
-def bandpass_sos(fc, q=2.5):
-    bw = fc/q
-    low = max(30.0, fc - bw/2.0)
-    high = min(SR/2 - 100.0, fc + bw/2.0)
-    return butter(2, [low/(SR/2), high/(SR/2)], btype='band', output='sos')
+    y *= np.float32(gain)
+    out = np.tanh(y); out *= np.float32(0.55)
+    np.clip(y, -0.6, 0.6, out=y); y *= np.float32(0.45)
+    out += y
+    return _norm_inplace(out)
 
 def wah_auto(x, f_lo=350, f_hi=2000, rate_hz=1.2, q=2.5):
     t = np.arange(len(x))/SR
     centers = f_lo + 0.5*(1+np.sin(2*np.pi*rate_hz*t))*(f_hi-f_lo)
-    y = np.zeros_like(x)
-    blk = 256
-    for i in range(0, len(x), blk):
-        sos = bandpass_sos(centers[i], q=q)
-        y[i:i+blk] = sosfilt(sos, x[i:i+blk])
+    # RBJ band-pass (0 dB peak) coefficients for every sample, normalized by a0
+    w0 = 2*np.pi*centers/SR
+    alpha = np.sin(w0)/(2*q)
+    a0 = 1 + alpha
+    b0 = alpha/a0
+    a1 = -2*np.cos(w0)/a0
+    a2 = (1 - alpha)/a0
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    y = np.empty_like(x)
+    _tv_biquad_kernel(x, b0, np.zeros_like(b0), -b0, a1, a2, y)
     return norm(y)
 
 def univibe(x, rate_hz=4.0, depth=0.9):
@@ -100,133 +117,125 @@ def univibe(x, rate_hz=4.0, depth=0.9):
     t = np.arange(len(x))/SR
     lfo = 0.6 + 0.4*np.sin(2*np.pi*rate_hz*t)
     bases = np.array([220, 440, 700, 1100], dtype=float)
-    y = x.copy()
-    def allpass(seg, fc, d=0.9):
-        w0 = 2*np.pi*fc/SR
-        a = (1 - np.sin(w0))/(1 + np.sin(w0))
-        out = np.zeros_like(seg); xm1=0.0; ym1=0.0
-        for n in range(len(seg)):
-            out[n] = -a*seg[n] + xm1 + a*ym1
-            xm1 = seg[n]; ym1 = out[n]
-        return (1-d)*seg + d*out
-    blk = 128
-    for base in bases:
-        z = np.zeros_like(y)
-        for i in range(0, len(y), blk):
-            fc = base * (0.5 + lfo[i])
-            z[i:i+blk] = allpass(y[i:i+blk], fc, depth)
+    # all-pass coefficients for every stage and sample, computed once
+    w0 = 2*np.pi*(bases[:,None]*(0.5 + lfo[None,:]))/SR
+    a = ((1 - np.sin(w0))/(1 + np.sin(w0))).astype(np.float32)
+    y = x.astype(np.float32)
+    for k in range(len(bases)):
+        z = np.empty_like(y)
+        _allpass_tv_kernel(y, a[k], np.float32(depth), z)
         y = z
     # slight AM "throb"
-    y *= (0.9*(1 + 0.15*np.sin(2*np.pi*(rate_hz/2.0)*t)))
+    y *= (0.9*(1 + 0.15*np.sin(2*np.pi*(rate_hz/2.0)*t))).astype(np.float32)
     return norm(y)
 
 def octavia(x):
     # octave-up via full-wave rectification, then fuzz
-    rect = np.abs(x)
-    y = np.tanh(6*(rect - 0.1))
-    return norm(y)
+    # one float32 buffer carried through rectify -> shape -> normalize
+    y = np.abs(x, dtype=np.float32)
+    y -= np.float32(0.1); y *= np.float32(6)
+    np.tanh(y, out=y)
+    return _norm_inplace(y)
 
 def leslie(x, rate_hz=5.5, dev_hz=3.0, am_depth=0.5):
     t = np.arange(len(x))/SR
-    am = 1 + am_depth*np.sin(2*np.pi*rate_hz*t)
-    fm = dev_hz*np.sin(2*np.pi*rate_hz*t)
+    lfo = np.sin(2*np.pi*rate_hz*t)  # shared by AM and FM
+    am = (1 + am_depth*lfo).astype(np.float32)
+    fm = dev_hz*lfo
     phase = 2*np.pi*np.cumsum((fm)/SR)
-    # apply FM by phase modulation around the original carrier content
-    y = am * np.sin(np.unwrap(np.angle(np.fft.ifft(np.fft.fft(x)))) + phase)
-    # The above is a crude trick; for musical signals, just modulate a sine carrier:
-    # y = am * np.sin(phase0 + 2*pi*fc*t + phase)
+    # apply FM by phase modulation of a sine carrier
+    fc = 330.0
+    # carrier phase stays float64 (it grows without bound); the samples don't
+    y = np.sin(2*np.pi*fc*t + phase).astype(np.float32)
+    y *= am
+    # mix some original back in, as chain_hendrix.leslie does
+    y *= np.float32(0.6); y += np.float32(0.4)*x
     return norm(y)
 
 def tape_echo(x, delay_ms=120, feedback=0.6, hf_loss=0.75):
-    d = int(SR*delay_ms/1000.0)
-    y = x.copy()
-    buf = np.zeros_like(x)
-    for n in range(d, len(x)):
-        prev = hf_loss*buf[n-d]
-        y[n] += feedback*prev
-        buf[n] = y[n]
-    return norm(y)
+    return norm(_tape_echo(x, delay_ms, feedback, hf_loss, sr=SR))
 
 def bitcrush(x, bits=8, downsample=3):
-    q = 2**bits
-    y = np.round(x*(q/2-1))/(q/2-1)
-    return norm(y[::downsample])
+    scale = (1 << (bits-1)) - 1
+    # decimate first (strided view), then quantize only the samples we keep
+    y = np.multiply(x[::downsample], scale, dtype=np.float32)
+    np.rint(y, out=y)
+    y *= np.float32(1.0/scale)
+    return _norm_inplace(y)
 
 # ---------- pipeline ----------
-def process(input_wav=None, outdir="out"):
+def _identity(x): return x
+
+# (file stem, effect, kwargs, time-plot title, second plot kind, its title)
+STAGES = [
+    ("00_clean",      _identity,       {},                                   "Clean",                   "fft",  "Clean (FFT)"),
+    ("01_compressor", compressor_soft, dict(drive_db=12),                    "Compressor (soft knee)",  "fft",  "Compressor (FFT)"),
+    ("02_fuzz",       fuzz_face_like,  {},                                   "Fuzz Face-style",         "fft",  "Fuzz Face-style (FFT)"),
+    ("03_hardclip",   hard_clip,       dict(th=0.6),                         "Hard clipping",           "fft",  "Hard clipping (FFT)"),
+    ("04_wah",        wah_auto,        dict(f_lo=350, f_hi=2000, rate_hz=1.2), "Wah (auto sweep)",      "spec", "Wah (spectrogram)"),
+    ("05_univibe",    univibe,         dict(rate_hz=4.0),                    "Uni-Vibe (phase wobble)", "fft",  "Uni-Vibe (FFT)"),
+    ("06_octavia",    octavia,         {},                                   "Octavia (full-wave)",     "fft",  "Octavia (FFT)"),
+    ("07_leslie",     leslie,          dict(rate_hz=5.5, dev_hz=3.0, am_depth=0.5), "Leslie (AM+FM)",   "fft",  "Leslie (FFT)"),
+    ("08_tape_echo",  tape_echo,       dict(delay_ms=120, feedback=0.6, hf_loss=0.75), "Tape echo",     "fft",  "Tape echo (FFT)"),
+    # bitcrush (as “truncation” example); time/fft on resampled length
+    ("09_bitcrush",   bitcrush,        dict(bits=8, downsample=2),           "Bitcrush/Downsample",     "fft",  "Bitcrush/Downsample (FFT)"),
+]
+
+# one reusable figure per plot shape and process, cleared between plots
+_CANVAS = {}
+def _canvas(kind):
+    if kind not in _CANVAS:
+        fig, ax = plt.subplots(figsize=(8,3))
+        _CANVAS[kind] = (ax, fig)
+    return _CANVAS[kind]
+
+def render_stage(x, outdir, stem, effect, kwargs, time_title, kind, kind_title):
+    """Run one effect on x and write its WAV + time plot + FFT/spectrogram plot."""
+    y = effect(x, **kwargs)
+    save_audio(f"{outdir}/{stem}.wav", y)
+    save_plot_time(*_canvas("time"), f"{outdir}/{stem}_time.svg", y, title=time_title)
+    plot = save_plot_spec if kind == "spec" else save_plot_fft
+    plot(*_canvas(kind), f"{outdir}/{stem}_{kind}.svg", y, title=kind_title)
+    return stem
+
+def process(input_wav=None, outdir="out", jobs=None):
     ensure_dir(outdir)
     # source audio
     if input_wav and os.path.isfile(input_wav):
-        x, sr = sf.read(input_wav, always_2d=False)
+        x, sr = sf.read(input_wav, dtype="float32", always_2d=False)
         assert sr == SR, f"Resample to {SR} Hz first (got {sr})"
-        x = norm(x.astype(float))
+        x = norm(x)
     else:
         x = guitarish_note(220, 2.0)
 
-    # save clean
-    save_audio(f"{outdir}/00_clean.wav", x)
-    save_plot_time(f"{outdir}/00_clean_time.svg", x, title="Clean")
-    save_plot_fft(f"{outdir}/00_clean_fft.svg", x, title="Clean (FFT)")
-
-    # compressor
-    c = compressor_soft(x, drive_db=12)
-    save_audio(f"{outdir}/01_compressor.wav", c)
-    save_plot_time(f"{outdir}/01_compressor_time.svg", c, title="Compressor (soft knee)")
-    save_plot_fft(f"{outdir}/01_compressor_fft.svg", c, title="Compressor (FFT)")
-
-    # fuzz face-esque
-    fz = fuzz_face_like(x)
-    save_audio(f"{outdir}/02_fuzz.wav", fz)
-    save_plot_time(f"{outdir}/02_fuzz_time.svg", fz, title="Fuzz Face-style")
-    save_plot_fft(f"{outdir}/02_fuzz_fft.svg", fz, title="Fuzz Face-style (FFT)")
-
-    # hard clip (truncation)
-    hc = hard_clip(x, th=0.6)
-    save_audio(f"{outdir}/03_hardclip.wav", hc)
-    save_plot_time(f"{outdir}/03_hardclip_time.svg", hc, title="Hard clipping")
-    save_plot_fft(f"{outdir}/03_hardclip_fft.svg", hc, title="Hard clipping (FFT)")
-
-    # wah (auto sweep) + spectrogram
-    wh = wah_auto(x, f_lo=350, f_hi=2000, rate_hz=1.2)
-    save_audio(f"{outdir}/04_wah.wav", wh)
-    save_plot_time(f"{outdir}/04_wah_time.svg", wh, title="Wah (auto sweep)")
-    save_plot_spec(f"{outdir}/04_wah_spec.svg", wh, title="Wah (spectrogram)")
-
-    # uni-vibe
-    uv = univibe(x, rate_hz=4.0)
-    save_audio(f"{outdir}/05_univibe.wav", uv)
-    save_plot_time(f"{outdir}/05_univibe_time.svg", uv, title="Uni-Vibe (phase wobble)")
-    save_plot_fft(f"{outdir}/05_univibe_fft.svg", uv, title="Uni-Vibe (FFT)")
-
-    # octavia
-    oc = octavia(x)
-    save_audio(f"{outdir}/06_octavia.wav", oc)
-    save_plot_time(f"{outdir}/06_octavia_time.svg", oc, title="Octavia (full-wave)")
-    save_plot_fft(f"{outdir}/06_octavia_fft.svg", oc, title="Octavia (FFT)")
-
-    # leslie
-    ls = leslie(x, rate_hz=5.5, dev_hz=3.0, am_depth=0.5)
-    save_audio(f"{outdir}/07_leslie.wav", ls)
-    save_plot_time(f"{outdir}/07_leslie_time.svg", ls, title="Leslie (AM+FM)")
-    save_plot_fft(f"{outdir}/07_leslie_fft.svg", ls, title="Leslie (FFT)")
-
-    # tape echo
-    te = tape_echo(x, delay_ms=120, feedback=0.6, hf_loss=0.75)
-    save_audio(f"{outdir}/08_tape_echo.wav", te)
-    save_plot_time(f"{outdir}/08_tape_echo_time.svg", te, title="Tape echo")
-    save_plot_fft(f"{outdir}/08_tape_echo_fft.svg", te, title="Tape echo (FFT)")
-
-    # bitcrush (as “truncation” example)
-    bc = bitcrush(x, bits=8, downsample=2)
-    save_audio(f"{outdir}/09_bitcrush.wav", bc)
-    # time/fft on resampled length
-    save_plot_time(f"{outdir}/09_bitcrush_time.svg", bc, title="Bitcrush/Downsample")
-    save_plot_fft(f"{outdir}/09_bitcrush_fft.svg", bc, title="Bitcrush/Downsample (FFT)")
+    # stages are independent given x: fan them out, each worker saves its own outputs
+    jobs = min(len(STAGES), jobs or os.cpu_count() or 1)
+    if jobs == 1:
+        try:
+            for stage in STAGES:
+                render_stage(x, outdir, *stage)
+        finally:
+            # the reused figures would otherwise outlive the run in a library caller
+            for ax, fig in _CANVAS.values():
+                plt.close(fig)
+            _CANVAS.clear()
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(render_stage, x, outdir, *stage) for stage in STAGES]
+        for fut in as_completed(futures):
+            fut.result()
+
+def _positive_int(s):
+    n = int(s)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be >= 1 (got {n})")
+    return n
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--in", dest="inp", help="optional input WAV @48kHz mono (e.g., your LMMS export)")
     ap.add_argument("--outdir", default="out")
+    ap.add_argument("--jobs", type=_positive_int, help="worker processes (default: all cores)")
     args = ap.parse_args()
-    process(args.inp, args.outdir)
+    process(args.inp, args.outdir, args.jobs)
 
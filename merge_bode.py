@@ -22,79 +22,98 @@ Example:
 import argparse
 import sys
 import re
+from itertools import chain
 from pathlib import Path
 import numpy as np
-import matplotlib.pyplot as plt
+from plot_helpers import decimate_idx, lower_index, pyplot as _pyplot
 
 COMMENT_PREFIXES = ('*', ';', '.')
 
-def _is_float(s: str) -> bool:
-    try:
-        float(s); return True
-    except Exception:
-        return False
-
 def _clean_lines(path: Path):
-    for raw in path.read_text(errors='ignore').splitlines():
-        s = raw.strip()
-        if not s: continue
-        if s.startswith(COMMENT_PREFIXES): continue
-        if s.lower().startswith(('index','no.','title','plotname','flags')): continue
-        yield s
+    with open(path, errors='ignore') as fh:
+        for raw in fh:
+            s = raw.strip()
+            if not s: continue
+            if s.startswith(COMMENT_PREFIXES): continue
+            if s.lower().startswith(('index','no.','title','plotname','flags')): continue
+            yield s
 
 def read_wrdata(path: Path):
     if not path.exists():
         sys.exit(f"ERROR: WRDATA not found: {path}")
-    lines = list(_clean_lines(path))
-    if not lines:
+    lines = _clean_lines(path)
+    first = next(lines, None)
+    if first is None:
         sys.exit(f"ERROR: WRDATA {path} is empty.")
     header = None
-    if re.search(r'[A-Za-z]', lines[0]):
-        header = re.split(r'\s+', lines[0].strip())
-        rows = lines[1:]
-    else:
-        rows = lines
-    data = []
-    for line in rows:
-        toks = re.split(r'\s+', line.strip())
-        try:
-            vals = [float(tok) for tok in toks]
-        except ValueError:
-            continue
-        if vals:
-            data.append(vals)
-    if not data:
+    if re.search(r'[A-Za-z]', first):
+        header = first.split()
+        first = next(lines, None)
+    try:
+        # stream the cleaned lines straight into np.loadtxt (parsed in C),
+        # never holding the whole file
+        arr = np.loadtxt(chain([first], lines), dtype=np.float64, ndmin=2) \
+            if first is not None else np.empty((0, 0))
+    except ValueError:
+        # ragged/garbled rows (rare): re-read the file and parse line by line
+        # into one preallocated, NaN-padded matrix as wide as the first good
+        # row, dropping bad rows
+        rows = list(_clean_lines(path))[1 if header else 0:]
+        arr, n = None, 0
+        for line in rows:
+            try:
+                vals = [float(tok) for tok in line.split()]
+            except ValueError:
+                continue
+            if not vals:
+                continue
+            if arr is None:
+                arr = np.full((len(rows), len(vals)), np.nan)
+            vals = vals[:arr.shape[1]]
+            arr[n, :len(vals)] = vals
+            n += 1
+        arr = arr[:n] if arr is not None else np.empty((0, 0))
+    finally:
+        lines.close()
+    if arr.size == 0:
         sys.exit(f"ERROR: no numeric rows in {path}")
-    arr = np.asarray(data, dtype=float)
     if not header or len(header) != arr.shape[1]:
         header = [f"col{i}" for i in range(arr.shape[1])]
-    return {name: arr[:, i] for i, name in enumerate(header)}
+    cols = {name: arr[:, i] for i, name in enumerate(header)}
+    return cols, lower_index(cols)
 
-def grab(cols, name, fallbacks=()):
+def grab(cols, lower_map, name, fallbacks=()):
     if name in cols:
-        return cols[name].astype(float)
+        return np.asarray(cols[name], dtype=float)
     for n in fallbacks:
-        if n in cols: return cols[n].astype(float)
+        if n in cols: return np.asarray(cols[n], dtype=float)
     # try case-insensitive match
-    for k in cols.keys():
-        if k.lower() == name.lower():
-            return cols[k].astype(float)
+    k = lower_map.get(name.lower())
+    if k is not None:
+        return np.asarray(cols[k], dtype=float)
     raise KeyError(name)
 
-def add_curve(ax_mag, ax_phase, cols, label, fcol, recol, imcol):
-    f   = grab(cols, fcol, ('Frequency','freq','f'))
-    re_ = grab(cols, recol, ('re:re','real(v(out))','re','real'))
-    im_ = grab(cols, imcol, ('im:im','imag(v(out))','im','imag'))
+def add_curve(ax_mag, ax_phase, cols, lower_map, label, fcol, recol, imcol):
+    f   = grab(cols, lower_map, fcol, ('Frequency','freq','f'))
+    re_ = grab(cols, lower_map, recol, ('re:re','real(v(out))','re','real'))
+    im_ = grab(cols, lower_map, imcol, ('im:im','imag(v(out))','im','imag'))
 
-    order = np.argsort(f)
-    f, re_, im_ = f[order], re_[order], im_[order]
-    mag = 20*np.log10(np.hypot(re_, im_) + 1e-24)
+    # ngspice AC sweeps come out ascending; only sort when they don't
+    if not np.all(f[1:] >= f[:-1]):
+        order = np.argsort(f, kind='stable')
+        f, re_, im_ = f[order], re_[order], im_[order]
+    mag = 10*np.log10(re_*re_ + im_*im_ + 1e-48)
     ph  = np.degrees(np.arctan2(im_, re_))
 
+    # an SVG can't show more points than this
+    idx = decimate_idx(f.size)
+    f, mag, ph = f[idx], mag[idx], ph[idx]
+
     ax_mag.semilogx(f, mag, label=label)
     ax_phase.semilogx(f, ph,  label=label)
 
 def save_svg(fig, outpath):
+    plt = _pyplot()
     fig.tight_layout()
     fig.savefig(outpath, format='svg', bbox_inches='tight')
     plt.close(fig)
@@ -114,6 +133,16 @@ def main():
     if not args.inputs:
         sys.exit("No inputs provided")
 
+    # parse every input before touching matplotlib, so bad files fail fast
+    curves = []
+    for spec in args.inputs:
+        p, _, label = spec.partition(':')
+        path = Path(p)
+        if not label:
+            label = path.stem
+        curves.append((label, *read_wrdata(path)))
+
+    plt = _pyplot()
     mag_fig = plt.figure(figsize=(3.25 if args.ieee else 8, 2.2 if args.ieee else 3))
     if args.title:
         plt.title(args.title)
@@ -124,13 +153,8 @@ def main():
         plt.title(args.title.replace("Magnitude", "Phase"))
     ax_phase = plt.gca()
 
-    for spec in args.inputs:
-        p, _, label = spec.partition(':')
-        path = Path(p)
-        if not label:
-            label = path.stem
-        cols = read_wrdata(path)
-        add_curve(ax_mag, ax_phase, cols, label, args.fcol, args.recol, args.imcol)
+    for label, cols, lower_map in curves:
+        add_curve(ax_mag, ax_phase, cols, lower_map, label, args.fcol, args.recol, args.imcol)
 
     ax_mag.set_xlabel("Frequency (Hz)");   ax_mag.set_ylabel("Magnitude (dB)")
     ax_phase.set_xlabel("Frequency (Hz)"); ax_phase.set_ylabel("Phase (degrees)")
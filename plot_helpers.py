@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""Small helpers shared by bode_quotient, merge_bode and plot_spice."""
+import numpy as np
+
+def lower_index(cols):
+    """Map lower-cased column names to their keys (first occurrence wins)."""
+    index = {}
+    for k in cols:
+        index.setdefault(k.lower(), k)
+    return index
+
+def decimate_idx(n, max_points=2000):
+    """Index picking at most max_points evenly spaced samples out of n."""
+    if n <= max_points:
+        return slice(None)
+    return np.unique(np.round(np.linspace(0, n-1, max_points)).astype(int))
+
+def pyplot():
+    # deferred: --help and bad inputs exit before the slow pyplot import
+    import matplotlib
+    matplotlib.use('Agg')  # SVG files only; skip GUI backend probing
+    import matplotlib.pyplot as plt
+    return plt
@@ -1,4 +1,6 @@
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # SVG files only; skip GUI backend probing
 import matplotlib.pyplot as plt
 import os
 
@@ -24,15 +26,9 @@ vrect = np.abs(vin)
 vout = 2.0 * vrect - 0.2
 vout = np.clip(vout, -1.2, 1.2)
 
-# 5. save data (optional but nice)
+# 5. save data (optional but nice) — binary .npy, columns: time_s, vin, vrect, vout
 data = np.column_stack([t, vin, vrect, vout])
-np.savetxt(
-    "out/data/octavia_ideal.csv",
-    data,
-    delimiter=",",
-    header="time_s,vin,vrect,vout",
-    comments=""
-)
+np.save("out/data/octavia_ideal.npy", data)
 
 # 6. plot, matching your other style
 plt.figure(figsize=(6.4, 2.4))
@@ -48,5 +44,5 @@ plt.ticklabel_format(style="plain", axis="y")
 plt.legend(frameon=False, fontsize=7)
 plt.tight_layout()
 plt.savefig("out/figs/octavia_time.svg")
-print("wrote out/figs/octavia_time.svg and out/data/octavia_ideal.csv")
+print("wrote out/figs/octavia_time.svg and out/data/octavia_ideal.npy")
 
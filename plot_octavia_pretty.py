@@ -1,7 +1,16 @@
+import os
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # SVG files only; skip GUI backend probing
 import matplotlib.pyplot as plt
 
-data = np.loadtxt("out/data/octavia.dat")
+# parse the SPICE text dump once; later runs read the binary .npy copy
+src, cache = "out/data/octavia.dat", "out/data/octavia.npy"
+if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(src):
+    data = np.load(cache)
+else:
+    data = np.loadtxt(src)
+    np.save(cache, data)
 
 t_ms = data[:, 0] * 1000.0
 vin  = data[:, 1]
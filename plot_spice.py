@@ -8,41 +8,60 @@ time-svg : plot time-domain traces from a WRDATA file
 fft-svg  : plot magnitude FFT of one column from a WRDATA file
 bode-svg : plot magnitude/phase from a WRDATA (re+im columns)
 four-svg : plot bar chart of harmonics parsed from an ngspice log
+batch    : run a JSON list of the above (argv lists) in one process
 """
 
 import argparse
+import json
 import sys
 import re
+from functools import lru_cache
+from itertools import chain
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # SVG files only; skip GUI backend probing
 import matplotlib.pyplot as plt
+from scipy.fft import rfft, rfftfreq, prev_fast_len
 from pathlib import Path
+from plot_helpers import lower_index as _lower_index
 
 COMMENT_PREFIXES = ('*', ';', '.')
 
+# .four log patterns, compiled once rather than per call/line
+_FREQ_RE = re.compile(r'at frequency\s*([-+\d\.eE]+)')
+_HARM_RE = re.compile(r'^\s*(\d+)\s+([-+\d\.eE]+)\s+([-+\d\.eE]+)\s+([-+\d\.eE]+)')
+
 # ------------------------------ helpers ------------------------------
 
-def _is_float(s: str) -> bool:
+def _floats(toks):
+    """Numeric tokens of a row as floats; non-numeric tokens are dropped."""
     try:
-        float(s); return True
-    except Exception:
-        return False
+        return list(map(float, toks))  # common case: one try for the whole row
+    except ValueError:
+        vals = []
+        for t in toks:
+            try: vals.append(float(t))
+            except ValueError: pass
+        return vals
 
 def _clean_lines(path: Path):
     """
     Yield non-empty, non-comment lines. Keep potential headers like 'Index time ...'.
     """
-    for raw in path.read_text(errors='ignore').splitlines():
-        s = raw.strip()
-        if not s:
-            continue
-        if s.startswith(COMMENT_PREFIXES):
-            continue
-        if s.lower().startswith(('no.', 'title', 'plotname', 'flags')):
-            continue
-        yield s
+    with open(path, errors='ignore') as fh:  # line by line, no whole-file string
+        for raw in fh:
+            s = raw.strip()
+            if not s:
+                continue
+            if s.startswith(COMMENT_PREFIXES):
+                continue
+            if s.lower().startswith(('no.', 'title', 'plotname', 'flags')):
+                continue
+            yield s
 
 def _split(line: str):
-    return re.split(r'\s+', line.strip())
+    # same as re.split(r"\s+") on a stripped line, without the regex
+    return line.split()
 
 def read_wrdata(path: str):
     """
@@ -57,37 +76,48 @@ def read_wrdata(path: str):
     if not p.exists():
         sys.exit(f"ERROR: WRDATA not found: {p}")
 
-    lines = list(_clean_lines(p))
-    if not lines:
+    lines = _clean_lines(p)
+    first = next(lines, None)
+    if first is None:
         sys.exit(f"ERROR: WRDATA {p} is empty or only comments.")
 
     # Decide header: it's a header iff at least one token is NOT a float.
-    first_toks = _split(lines[0])
-    header = None
-    if any(not _is_float(tok) for tok in first_toks):
-        header = first_toks
-        rows = lines[1:]
-    else:
-        rows = lines
-
-    # Parse data rows → numeric matrix
-    data = []
-    for line in rows:
-        toks = _split(line)
-        # skip fully non-numeric (rare)
-        if not any(_is_float(t) for t in toks):
-            continue
-        try:
-            vals = [float(t) for t in toks if _is_float(t)]
-        except ValueError:
-            continue
-        if vals:
-            data.append(vals)
-
-    if not data:
+    first_toks = _split(first)
+    try:
+        list(map(float, first_toks))
+        header = None
+    except ValueError:
+        header, first = first_toks, next(lines, None)
+
+    # Parse data rows → numeric matrix (in C; the rows are already comment-free
+    # and stream in from the file, never held as a whole)
+    try:
+        arr = np.loadtxt(chain([first], lines), dtype=np.float64, ndmin=2) \
+            if first is not None else np.empty((0, 0))
+    except ValueError:
+        # stray tokens or ragged rows (rare): re-read the file on a slow path,
+        # keep only the numeric tokens, written into one preallocated
+        # NaN-padded matrix as wide as the first numeric row (the header only
+        # names columns, below)
+        rows = list(_clean_lines(p))[1 if header else 0:]
+        arr, n = None, 0
+        for line in rows:
+            vals = _floats(_split(line))
+            # skip fully non-numeric (rare)
+            if not vals:
+                continue
+            if arr is None:
+                arr = np.full((len(rows), len(vals)), np.nan)
+            vals = vals[:arr.shape[1]]
+            arr[n, :len(vals)] = vals
+            n += 1
+        arr = arr[:n] if arr is not None else np.empty((0, 0))
+    finally:
+        lines.close()
+
+    if arr.size == 0:
         sys.exit(f"ERROR: No numeric rows found in WRDATA {p}.")
 
-    arr = np.asarray(data, dtype=float)
     ncols = arr.shape[1]
 
     if header is None or len(header) != ncols:
@@ -104,36 +134,67 @@ def read_wrdata(path: str):
     dat = {name: arr[:, i] for i, name in enumerate(header)}
     return dat, header
 
+# batch mode keeps one figure per size and clears it between plots
+_CANVAS = {}
+_REUSE_FIGS = False
+
+def _figure(ieee=False):
+    size = (3.25, 2.2) if ieee else (8, 3)
+    if not _REUSE_FIGS:
+        return plt.figure(figsize=size)
+    fig = _CANVAS.get(size)
+    if fig is None:
+        fig = _CANVAS[size] = plt.figure(figsize=size)
+    else:
+        fig.clear()
+        plt.figure(fig.number)  # make it current for the plt.* calls
+    return fig
+
 def _save_svg(fig, outpath: str, tight=True):
     fig.tight_layout()
     fig.savefig(outpath, format='svg', bbox_inches='tight' if tight else None)
-    plt.close(fig)
+    if not _REUSE_FIGS:
+        plt.close(fig)
 
-def _case_get(d: dict, key: str):
+@lru_cache(maxsize=8)
+def _hann(n: int):
+    """Read-only Hann window of length n, built once per length."""
+    w = np.hanning(n)
+    w.setflags(write=False)
+    return w
+
+def _plot_stride(n: int, max_points: int = 200_000):
+    """Sample stride that leaves at most max_points of n for plotting."""
+    return max(1, -(-n // max_points))
+
+def _case_get(d: dict, key: str, lower=None):
     if key in d: return key
-    lk = key.lower()
-    for k in d.keys():
-        if k.lower() == lk: return k
-    return None
+    if lower is None:
+        lower = _lower_index(d)
+    return lower.get(key.lower())
 
 # ------------------------------ plotters ------------------------------
 
 def plot_time_svg(dat, xcol, ycols, title, outpath, ieee=False):
+    lower = _lower_index(dat)
     # x: accept 'time' or fallback to col0 when absent
-    kx = _case_get(dat, xcol)
+    kx = _case_get(dat, xcol, lower)
     if kx is None and xcol.lower() == 'time' and 'col0' in dat:
         kx = 'col0'
     if kx is None:
         sys.exit(f"ERROR: x column '{xcol}' not found. Available: {list(dat.keys())}")
 
-    x = dat[kx].astype(float)
+    # an SVG polyline can't show more than this; stride down and hand
+    # matplotlib float32 (the data only needs pixel precision from here on)
+    step = _plot_stride(len(dat[kx]))
+    x = dat[kx][::step].astype(np.float32)
 
     # Build list of (series_key, label). If named series not found and we have
     # unlabeled cols (col1..), map sequentially so charts still render.
     series = []
     missing = []
     for idx, yname in enumerate(ycols, start=1):
-        ky = _case_get(dat, yname)
+        ky = _case_get(dat, yname, lower)
         if ky is not None:
             series.append((ky, yname))
         else:
@@ -149,12 +210,12 @@ def plot_time_svg(dat, xcol, ycols, title, outpath, ieee=False):
     if missing and series:
         print(f"NOTE: remapped unnamed time columns for {missing} -> {[s for _, s in series]}")
 
-    fig = plt.figure(figsize=(3.25 if ieee else 8, 2.2 if ieee else 3))
+    fig = _figure(ieee)
     if title:
         plt.title(title)
 
     for ky, lbl in series:
-        plt.plot(x, np.asarray(dat[ky], dtype=float), label=lbl)
+        plt.plot(x, dat[ky][::step].astype(np.float32), label=lbl)
 
     plt.xlabel(kx)
     plt.ylabel("Amplitude")
@@ -168,20 +229,28 @@ def plot_fft_svg(dat, ycol, sr, xlim, title, outpath, ieee=False):
     if ky is None:
         sys.exit(f"ERROR: y column '{ycol}' not found. Available: {list(dat.keys())}")
 
-    y = dat[ky].astype(float)
-    N = len(y)
+    N = len(dat[ky])
     if N < 4:
         sys.exit("ERROR: not enough samples for FFT.")
-    N = min(65536, N - (N % 2))
-    window = np.hanning(N)
-    Y = np.fft.rfft(window * y[:N])
-    f = np.fft.rfftfreq(N, 1.0 / sr)
+    # largest even length <= N whose factors pocketfft handles fastest
+    N = 2 * prev_fast_len(min(65536, N) // 2, real=True)
+    # one contiguous copy of just the analysed span, windowed in place
+    y = np.array(dat[ky][:N], dtype=np.float64)
+    y *= _hann(N)
+    Y = rfft(y, workers=-1)
+    f = rfftfreq(N, 1.0 / sr)
+    if xlim:
+        # only the visible bins go through abs/log10 and into the plot
+        lo, hi = sorted(xlim)
+        i0, i1 = np.searchsorted(f, lo, 'left'), np.searchsorted(f, hi, 'right')
+        f, Y = f[i0:i1], Y[i0:i1]
     mag = 20 * np.log10(np.abs(Y) + 1e-12)
 
-    fig = plt.figure(figsize=(3.25 if ieee else 8, 2.2 if ieee else 3))
+    fig = _figure(ieee)
     if title:
         plt.title(title)
-    plt.plot(f, mag)
+    # computed in float64; drawn in float32
+    plt.plot(f.astype(np.float32), mag.astype(np.float32))
     plt.xlabel("Frequency (Hz)")
     plt.ylabel("Magnitude (dBFS)")
     if xlim:
@@ -189,15 +258,11 @@ def plot_fft_svg(dat, ycol, sr, xlim, title, outpath, ieee=False):
     _save_svg(fig, outpath)
 
 def plot_bode_svg(dat, fcol, yr_name, yi_name, title, out_mag, out_phase, ieee=False):
+    lower = _lower_index(dat)
     def _k(d, name, alts=()):
-        if name in d: return name
-        lname = name.lower()
-        for k in d:
-            if k.lower() == lname: return k
-        for a in alts:
-            if a in d: return a
-            for k in d:
-                if k.lower() == a.lower(): return k
+        for nm in (name, *alts):
+            k = _case_get(d, nm, lower)
+            if k is not None: return k
         return None
 
     kf = _k(dat, fcol, ('freq', 'frequency(Hz)', 'Frequency'))
@@ -220,13 +285,14 @@ def plot_bode_svg(dat, fcol, yr_name, yi_name, title, out_mag, out_phase, ieee=F
         re = np.array([0.0, 0.0])
         im = np.array([0.0, 0.0])
 
-    H = re + 1j*im
-    mag_db = 20*np.log10(np.maximum(np.abs(H), 1e-15))
-    # Phase unwrap in degrees
-    phase_deg = np.unwrap(np.angle(H)) * (180.0/np.pi)
+    # 10*log10(re^2 + im^2) == 20*log10(|H|), without the complex H or the sqrt
+    mag_db = 10*np.log10(np.maximum(re*re + im*im, 1e-30))
+    # Phase unwrap in degrees; unwrapping in cycles keeps the wrap corrections
+    # integral, so they add up without rounding drift along long sweeps
+    phase_deg = np.unwrap(np.arctan2(im, re) / (2*np.pi), period=1.0) * 360.0
 
     # Magnitude
-    fig = plt.figure(figsize=(3.25 if ieee else 8, 2.2 if ieee else 3))
+    fig = _figure(ieee)
     if title: plt.title(title)
     plt.semilogx(f, mag_db)
     plt.xlabel("Frequency (Hz)")
@@ -234,7 +300,7 @@ def plot_bode_svg(dat, fcol, yr_name, yi_name, title, out_mag, out_phase, ieee=F
     _save_svg(fig, out_mag)
 
     # Phase
-    fig = plt.figure(figsize=(3.25 if ieee else 8, 2.2 if ieee else 3))
+    fig = _figure(ieee)
     if title: plt.title(title.replace("Magnitude", "Phase"))
     plt.semilogx(f, phase_deg)
     plt.xlabel("Frequency (Hz)")
@@ -250,33 +316,32 @@ def parse_four_log(path, node=None):
     p = Path(path)
     if not p.exists():
         sys.exit(f"ERROR: log not found: {p}")
-    txt = p.read_text(errors='ignore').splitlines()
     rows, fund, capture = [], None, False
-    pat = re.compile(r'^\s*(\d+)\s+([-\d\.eE]+)\s+([-\d\.eE]+)\s+([-\d\.eE]+)')
 
-    for line in txt:
-        if 'Fourier components of' in line:
-            if node and node.lower() not in line.lower():
-                capture = False
+    with open(p, errors='ignore') as txt:
+        for line in txt:
+            if 'Fourier components of' in line:
+                if node and node.lower() not in line.lower():
+                    capture = False
+                    continue
+                m = _FREQ_RE.search(line)
+                if m:
+                    try:
+                        fund = float(m.group(1))
+                    except Exception:
+                        fund = None
+                capture = True
                 continue
-            m = re.search(r'at frequency\s*([-\d\.eE]+)', line)
-            if m:
-                try:
-                    fund = float(m.group(1))
-                except Exception:
-                    fund = None
-            capture = True
-            continue
-        if capture:
-            m = pat.match(line)
-            if m:
-                n = int(m.group(1))
-                mag = float(m.group(2))
-                db = float(m.group(3))
-                ph = float(m.group(4))
-                rows.append((n, db, ph, mag))
-            elif line.strip() == '' and rows:
-                break
+            if capture:
+                m = _HARM_RE.match(line)
+                if m:
+                    n = int(m.group(1))
+                    mag = float(m.group(2))
+                    db = float(m.group(3))
+                    ph = float(m.group(4))
+                    rows.append((n, db, ph, mag))
+                elif line.strip() == '' and rows:
+                    break
 
     return {'freq': fund, 'rows': rows}
 
@@ -284,7 +349,7 @@ def plot_four_svg(parsed, title, outpath, limit=10, ieee=False):
     rows = parsed['rows'][:limit]
     harms = [r[0] for r in rows]
     mags = [r[1] for r in rows]  # dB column
-    fig = plt.figure(figsize=(3.25 if ieee else 8, 2.2 if ieee else 3))
+    fig = _figure(ieee)
     if title:
         plt.title(title)
     plt.bar(harms, mags)
@@ -294,7 +359,7 @@ def plot_four_svg(parsed, title, outpath, limit=10, ieee=False):
 
 # ------------------------------ CLI ------------------------------
 
-def main():
+def _parser():
     ap = argparse.ArgumentParser(description="Plot helpers for ngspice WRDATA/logs")
     sub = ap.add_subparsers(dest='cmd', required=True)
 
@@ -337,8 +402,13 @@ def main():
     ap_4.add_argument('--limit', type=int, default=10)
     ap_4.add_argument('--ieee', action='store_true')
 
-    args = ap.parse_args()
+    # batch
+    ap_x = sub.add_parser('batch', help='Run many plot jobs with one matplotlib import')
+    ap_x.add_argument('jobs', help='JSON list of argv lists, e.g. [["time-svg", "a.dat", "--xcol", "time", ...], ...]')
+
+    return ap
 
+def _run(args):
     if args.cmd == 'time-svg':
         dat, _ = read_wrdata(args.wrdata)
         plot_time_svg(dat, args.xcol, args.ycols, args.title, args.out, ieee=args.ieee)
@@ -357,6 +427,35 @@ def main():
         parsed = parse_four_log(args.logfile, node=args.node)
         plot_four_svg(parsed, args.title, args.out, args.limit, ieee=args.ieee)
 
+    elif args.cmd == 'batch':
+        run_batch(args.jobs)
+
+def run_batch(jobs_path):
+    """Run each job of a JSON job list through the normal CLI parser, reusing figures."""
+    global _REUSE_FIGS
+    try:
+        jobs = json.loads(Path(jobs_path).read_text())
+    except (OSError, ValueError) as e:
+        sys.exit(f"ERROR: cannot read batch file {jobs_path}: {e}")
+    if not isinstance(jobs, list) or not all(isinstance(j, list) for j in jobs):
+        sys.exit("ERROR: batch file must be a JSON list of argument lists.")
+    ap = _parser()
+    _REUSE_FIGS = True
+    try:
+        for job in jobs:
+            args = ap.parse_args([str(tok) for tok in job])
+            if args.cmd == 'batch':
+                sys.exit("ERROR: nested batch jobs are not supported.")
+            _run(args)
+    finally:
+        _REUSE_FIGS = False
+        for fig in _CANVAS.values():
+            plt.close(fig)
+        _CANVAS.clear()
+
+def main():
+    _run(_parser().parse_args())
+
 if __name__ == '__main__':
     main()
 
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""Tape-style feedback delay shared by chain_hendrix, hendrix_lab and echo_ir."""
+import numpy as np
+from scipy.signal import lfilter
+
+def tape_echo(x, delay_ms=120, feedback=0.6, hf_loss=0.75, sr=48000):
+    """y[n] = x[n] + feedback*hf_loss*y[n-d] as float32; not normalized."""
+    d = int(sr*delay_ms/1000.0)
+    if d < 1:
+        return np.array(x, dtype=np.float32)
+    # each phase n mod d is an independent one-pole IIR, so lay the
+    # phases out as columns and filter them all at once
+    n = len(x); rows = -(-n // d)
+    cols = np.zeros(rows*d, dtype=np.float32)
+    cols[:n] = x
+    # float32 taps keep lfilter from promoting the whole buffer to float64
+    y = lfilter(np.float32([1.0]), np.float32([1.0, -feedback*hf_loss]), cols.reshape(rows, d), axis=0)
+    return y.reshape(-1)[:n]
@@ -10,30 +10,34 @@ Usage:
 import argparse, re, sys, numpy as np, matplotlib.pyplot as plt
 from pathlib import Path
 
+# Example matchers: adapt to how you echo nodes in your .control if needed.
+# One alternation, so each line is scanned once; node names match any case.
+LINE_RE = re.compile(
+    r'Temperature\s*=\s*(?P<t>[-+\d\.eE]+)'
+    r'|(?i:v\(c2\))\s*=\s*(?P<c2>[-+\d\.eE]+)'
+    r'|(?i:v\(b1\))\s*=\s*(?P<b1>[-+\d\.eE]+)'
+    r'|(?i:i\(vsig\))\s*=\s*(?P<i>[-+\d\.eE]+)')
+
 def parse_op_log(path):
     p = Path(path)
     if not p.exists():
         sys.exit(f"ERROR: log not found: {p}")
-    text = p.read_text(errors="ignore").splitlines()
     temps, vc2, vb1, iin = [], [], [], []
-    tpat = re.compile(r'Temperature\s*=\s*([-\d\.eE]+)')
-    # Example matchers: adapt to how you echo nodes in your .control if needed
-    c2pat = re.compile(r'v\(c2\)\s*=\s*([-\d\.eE]+)', re.I)
-    b1pat = re.compile(r'v\(b1\)\s*=\s*([-\d\.eE]+)', re.I)
-    inpat = re.compile(r'i\(vsig\)\s*=\s*([-\d\.eE]+)', re.I)
 
     cur_t = None; cur_c2 = None; cur_b1 = None; cur_i = None
-    for line in text:
-        m = tpat.search(line)
-        if m:
-            # push previous record if complete
-            if cur_t is not None and None not in (cur_c2, cur_b1, cur_i):
-                temps.append(cur_t); vc2.append(cur_c2); vb1.append(cur_b1); iin.append(cur_i)
-            cur_t = float(m.group(1)); cur_c2 = cur_b1 = cur_i = None
-            continue
-        m = c2pat.search(line);  cur_c2 = float(m.group(1)) if m else cur_c2
-        m = b1pat.search(line);  cur_b1 = float(m.group(1)) if m else cur_b1
-        m = inpat.search(line);  cur_i  = float(m.group(1)) if m else cur_i
+    with open(p, errors="ignore") as text:
+        for line in text:
+            for m in LINE_RE.finditer(line):
+                key = m.lastgroup; val = float(m.group(key))
+                if key == 't':
+                    # push previous record if complete
+                    if cur_t is not None and None not in (cur_c2, cur_b1, cur_i):
+                        temps.append(cur_t); vc2.append(cur_c2); vb1.append(cur_b1); iin.append(cur_i)
+                    cur_t = val; cur_c2 = cur_b1 = cur_i = None
+                    break
+                if key == 'c2':   cur_c2 = val
+                elif key == 'b1': cur_b1 = val
+                else:             cur_i  = val
 
     if cur_t is not None and None not in (cur_c2, cur_b1, cur_i):
         temps.append(cur_t); vc2.append(cur_c2); vb1.append(cur_b1); iin.append(cur_i)
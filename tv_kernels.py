@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""Numba time-varying filter kernels shared by chain_hendrix and hendrix_lab."""
+import numpy as np
+from numba import njit
+
+@njit(cache=True, fastmath=True)
+def allpass_tv_kernel(seg, a, d, out):
+    # first-order all-pass with a per-sample coefficient a[n], dry/wet mixed
+    xm1 = 0.0; ym1 = 0.0
+    for n in range(len(seg)):
+        o = -a[n]*seg[n] + xm1 + a[n]*ym1
+        xm1 = seg[n]; ym1 = o
+        out[n] = (1-d)*seg[n] + d*o
+
+@njit(cache=True, fastmath=True)
+def tv_biquad_kernel(x, b0, b1, b2, a1, a2, y):
+    # direct-form II biquad with per-sample coefficients; state stays in registers
+    z1 = 0.0; z2 = 0.0
+    for n in range(len(x)):
+        v = x[n] - a1[n]*z1 - a2[n]*z2
+        y[n] = b0[n]*v + b1[n]*z1 + b2[n]*z2
+        z2 = z1; z1 = v
+
+def _warmup():
+    # compile once at import so the first real call isn't hit by JIT latency
+    z = np.zeros(2, dtype=np.float32)
+    allpass_tv_kernel(z, z, np.float32(0.5), np.empty_like(z))
+    c = np.zeros(2)
+    tv_biquad_kernel(z, c, c, c, c, c, np.empty_like(z))
+
+_warmup()
@@ -1,58 +1,138 @@
 #!/usr/bin/env python3
-import argparse, re, csv, sys
+import argparse, re, csv, sys, math
+from itertools import chain
 import numpy as np
 from pathlib import Path
 
 COMMENT_PREFIXES = ('*', ';', '.')
 
 def _clean_lines(path: Path):
+    with open(path, errors='ignore') as fh:
+        for raw in fh:
+            s = raw.strip()
+            if not s: continue
+            if s.startswith(COMMENT_PREFIXES): continue
+            if s.lower().startswith(('index','no.','title','plotname','flags')): continue
+            yield s
+
+COLLAPSED_HEADER = ['frequency', 're', 'im']  # what wr_collapse.py writes
+
+def read_wrdata_fast(path):
+    """Parse a wr_collapse.py output file straight from the open handle.
+
+    Returns None when the file isn't in that strict form, so the caller can
+    fall back to the generic reader."""
+    try:
+        with open(path, errors='ignore') as fh:
+            if fh.readline().split() != COLLAPSED_HEADER:
+                return None
+            arr = np.loadtxt(fh, dtype=np.float64, ndmin=2)
+    except (OSError, ValueError):
+        return None
+    if arr.shape[0] == 0 or arr.shape[1] != len(COLLAPSED_HEADER):
+        return None
+    return {name: arr[:, i] for i, name in enumerate(COLLAPSED_HEADER)}
+
+def read_wrdata(path):
+    cols = read_wrdata_fast(path)
+    if cols is not None:
+        return cols
+    path = Path(path)
     if not path.exists():
         sys.exit(f"ERROR: WRDATA not found: {path}")
-    lines = []
-    for raw in path.read_text(errors='ignore').splitlines():
-        s = raw.strip()
-        if not s: continue
-        if s.startswith(COMMENT_PREFIXES): continue
-        if s.lower().startswith(('index','no.','title','plotname','flags')): continue
-        lines.append(s)
-    if not lines:
+    lines = _clean_lines(path)
+    first = next(lines, None)
+    if first is None:
         sys.exit(f"ERROR: WRDATA {path} is empty.")
-    return lines
-
-def read_wrdata(path):
-    lines = _clean_lines(Path(path))
     header = None
-    if re.search(r'[A-Za-z]', lines[0]):
-        header = re.split(r'\s+', lines[0].strip())
-        rows = lines[1:]
-    else:
-        rows = lines
-    data = []
-    for line in rows:
-        toks = re.split(r'\s+', line)
-        try:
-            vals = [float(tok) for tok in toks]
-        except ValueError:
-            continue
-        if vals:
-            data.append(vals)
-    if not data:
+    if re.search(r'[A-Za-z]', first):
+        header = first.split()
+        first = next(lines, None)
+    try:
+        # rows are already comment-free, so stream them straight into
+        # np.loadtxt (parsed in C) without holding the whole file
+        arr = np.loadtxt(chain([first], lines), dtype=np.float64, ndmin=2) \
+            if first is not None else np.empty((0, 0))
+    except ValueError:
+        # ragged/garbled rows (rare): re-read the file and parse line by line
+        # into one preallocated, NaN-padded matrix as wide as the first good
+        # row, dropping bad rows
+        rows = list(_clean_lines(path))[1 if header else 0:]
+        arr, n = None, 0
+        for line in rows:
+            try:
+                vals = [float(tok) for tok in line.split()]
+            except ValueError:
+                continue
+            if not vals:
+                continue
+            if arr is None:
+                arr = np.full((len(rows), len(vals)), np.nan)
+            vals = vals[:arr.shape[1]]
+            arr[n, :len(vals)] = vals
+            n += 1
+        arr = arr[:n] if arr is not None else np.empty((0, 0))
+    finally:
+        lines.close()
+    if arr.size == 0:
         sys.exit(f"ERROR: no numeric rows in {path}")
-    arr = np.asarray(data, dtype=float)
     if not header or len(header) != arr.shape[1]:
         header = [f"col{i}" for i in range(arr.shape[1])]
     return {name: arr[:, i] for i, name in enumerate(header)}
 
-def db(v):
-    return 20*np.log10(np.maximum(v, 1e-24))
+def _first(cols, *names):
+    """First of names present in cols (arrays can't be chained with `or`)."""
+    for nm in names:
+        if nm in cols:
+            return cols[nm]
+    return None
+
+def db(re_, im_):
+    """20*log10|re + j*im| as 10*log10(re^2 + im^2), built in one buffer."""
+    p = re_*re_
+    p += im_*im_
+    np.maximum(p, 1e-48, out=p)
+    np.log10(p, out=p)
+    p *= 10
+    return p
+
+# sweeps longer than this walk outward from the peak in a JIT loop; shorter
+# ones stay on the numpy scan so a one-file run never pays numba's import
+JIT_MIN_POINTS = 1 << 16
+
+def _edge_walk(mag_db, peak_idx, target):
+    # outward walk touching only the resonance, not the whole sweep
+    lo = peak_idx
+    while lo > 0 and mag_db[lo] > target:
+        lo -= 1
+    hi = peak_idx
+    while hi < len(mag_db)-1 and mag_db[hi] > target:
+        hi += 1
+    return lo, hi
+
+_edge_walk_kernel = None
+def _jit_edge_walk():
+    global _edge_walk_kernel
+    if _edge_walk_kernel is None:
+        from numba import njit
+        # no fastmath: the walk must see NaN as "not above target"
+        _edge_walk_kernel = njit(cache=True)(_edge_walk)
+    return _edge_walk_kernel
 
 def find_band_edges(f, mag_db, peak_idx):
     peak_mag = mag_db[peak_idx]
     target = peak_mag - 3.0
-    # Search left
-    lo_idx = peak_idx
-    while lo_idx > 0 and mag_db[lo_idx] > target:
-        lo_idx -= 1
+    if len(mag_db) >= JIT_MIN_POINTS:
+        mag_db = np.ascontiguousarray(mag_db, dtype=np.float64)
+        lo_idx, hi_idx = _jit_edge_walk()(mag_db, peak_idx, target)
+    else:
+        # nearest sample at/below target on each side, peak included (NaN counts
+        # as below): one vectorized comparison instead of walking in Python
+        below = ~(mag_db > target)
+        left = np.flatnonzero(below[:peak_idx+1])
+        lo_idx = int(left[-1]) if left.size else 0
+        right = np.flatnonzero(below[peak_idx:])
+        hi_idx = peak_idx + int(right[0]) if right.size else len(f)-1
     # linear interp
     if lo_idx < peak_idx:
         x0,x1 = f[lo_idx], f[lo_idx+1]
@@ -60,10 +140,6 @@ def find_band_edges(f, mag_db, peak_idx):
         flo = x0 + (target - y0) * (x1 - x0) / (y1 - y0 + 1e-24)
     else:
         flo = f[0]
-    # Search right
-    hi_idx = peak_idx
-    while hi_idx < len(f)-1 and mag_db[hi_idx] > target:
-        hi_idx += 1
     if hi_idx > peak_idx:
         x0,x1 = f[hi_idx-1], f[hi_idx]
         y0,y1 = mag_db[hi_idx-1], mag_db[hi_idx]
@@ -93,37 +169,62 @@ def main():
     if len(labels) != len(args.inputs):
         sys.exit("ERROR: number of labels must match number of inputs.")
 
-    rows = []
-    for pos, path in zip(labels, args.inputs):
+    # read every curve first so co-gridded sweeps can be reduced in one batch
+    curves = []
+    for path in args.inputs:
         cols = read_wrdata(path)
         # tolerate variants
-        f = (cols.get(args.fcol) or cols.get('Frequency') or cols.get('freq'))
+        f = _first(cols, args.fcol, 'Frequency', 'freq')
         if f is None:
             sys.exit(f"ERROR: cannot find frequency column in {path}")
-        re_ = (cols.get(args.recol) or cols.get('re:re') or cols.get('real(v(out))') or cols.get('re'))
-        im_ = (cols.get(args.imcol) or cols.get('im:im') or cols.get('imag(v(out))') or cols.get('im'))
+        re_ = _first(cols, args.recol, 're:re', 'real(v(out))', 're')
+        im_ = _first(cols, args.imcol, 'im:im', 'imag(v(out))', 'im')
         if re_ is None or im_ is None:
             sys.exit(f"ERROR: cannot find complex columns in {path}")
-        f = f.astype(float)
-        mag = np.hypot(re_.astype(float), im_.astype(float))
-        mag_db = db(mag)
+        f, re_, im_ = f.astype(float), re_.astype(float), im_.astype(float)
         # ensure monotonic f for edge-finding
-        order = np.argsort(f); f = f[order]; mag_db = mag_db[order]
-        f0, flo, fhi, bw, Q = f0_bw_q(f, mag_db)
-        rows.append((float(pos) if re.fullmatch(r'[-+]?\d*\.?\d+', str(pos)) else pos, f0, flo, fhi, bw, Q))
+        order = np.argsort(f)
+        curves.append((f[order], re_[order], im_[order]))
 
-    # Sort numeric labels if possible; keep original order otherwise
-    try:
-        rows.sort(key=lambda r: float(r[0]))
-    except Exception:
-        pass
+    f_ref = curves[0][0]
+    if all(np.array_equal(c[0], f_ref) for c in curves[1:]):
+        # shared frequency grid (the usual position sweep): one (N, M) pass
+        mag_db = db(np.stack([c[1] for c in curves]), np.stack([c[2] for c in curves]))
+        peaks = np.argmax(mag_db, axis=1)
+        results = [find_band_edges(f_ref, m, int(k)) for m, k in zip(mag_db, peaks)]
+    else:
+        results = [f0_bw_q(f, db(re_, im_)) for f, re_, im_ in curves]
+
+    rows = []
+    for pos, (f0, flo, fhi, bw, Q) in zip(labels, results):
+        # classify the label once: finite numeric positions become floats;
+        # nan/inf stay text so the sort key below is always well defined
+        try:
+            v = float(pos)
+        except ValueError:
+            v = None
+        if v is not None and math.isfinite(v):
+            pos = v
+        rows.append((pos, f0, flo, fhi, bw, Q))
+
+    # Numeric labels in ascending order; text labels keep their order, after them
+    rows.sort(key=lambda r: r[0] if isinstance(r[0], float) else float('inf'))
 
     Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    columns = ['position','f0_hz','flo_-3dB_hz','fhi_-3dB_hz','bw_hz','Q']
     with open(args.out, 'w', newline='') as fh:
-        w = csv.writer(fh)
-        w.writerow(['position','f0_hz','flo_-3dB_hz','fhi_-3dB_hz','bw_hz','Q'])
-        for r in rows:
-            w.writerow([r[0], f'{r[1]:.2f}', f'{r[2]:.2f}', f'{r[3]:.2f}', f'{r[4]:.2f}', f'{r[5]:.2f}'])
+        if all(isinstance(r[0], float) for r in rows):
+            # all-numeric table: format it in one np.savetxt call (CRLF like csv.writer)
+            np.savetxt(fh, np.array(rows, dtype=np.float64), fmt=['%.12g'] + ['%.2f']*5,
+                       delimiter=',', newline='\r\n', header=','.join(columns), comments='')
+        else:
+            # text labels may need CSV quoting
+            w = csv.writer(fh)
+            w.writerow(columns)
+            for r in rows:
+                # numeric labels formatted exactly as the savetxt path writes them
+                pos = f'{r[0]:.12g}' if isinstance(r[0], float) else r[0]
+                w.writerow([pos, f'{r[1]:.2f}', f'{r[2]:.2f}', f'{r[3]:.2f}', f'{r[4]:.2f}', f'{r[5]:.2f}'])
 
 if __name__ == '__main__':
     main()
@@ -9,22 +9,34 @@ Usage:
 
 import sys, re
 from pathlib import Path
+import numpy as np
 
 COMMENT_PREFIXES = ('*', ';', '.')
 
-def is_float(s):
+# lower-cased header names accepted for each output column
+F_CANDS = frozenset(('frequency', 'freq', 'f'))
+R_CANDS = frozenset(('real(v(out))', 're:re', 're', 'real'))
+I_CANDS = frozenset(('imag(v(out))', 'im:im', 'im', 'imag'))
+
+def floats(toks):
+    """Numeric tokens of a row as floats; non-numeric tokens are dropped."""
     try:
-        float(s); return True
-    except Exception:
-        return False
+        return list(map(float, toks))  # common case: one try for the whole row
+    except ValueError:
+        nums = []
+        for t in toks:
+            try: nums.append(float(t))
+            except ValueError: pass
+        return nums
 
 def load_rows(path: Path):
-    for raw in path.read_text(errors="ignore").splitlines():
-        s = raw.strip()
-        if not s: continue
-        if s.startswith(COMMENT_PREFIXES): continue
-        if s.lower().startswith(('index','no.','title','plotname','flags')): continue
-        yield s
+    with open(path, errors="ignore") as fh:
+        for raw in fh:
+            s = raw.strip()
+            if not s: continue
+            if s.startswith(COMMENT_PREFIXES): continue
+            if s.lower().startswith(('index','no.','title','plotname','flags')): continue
+            yield s
 
 def main():
     if len(sys.argv) != 3:
@@ -43,49 +55,52 @@ def main():
     header = None
     # header if first non-empty line has any alpha chars
     if re.search(r'[A-Za-z]', lines[0]):
-        header = re.split(r'\s+', lines[0].strip())
+        header = lines[0].split()
         rows = lines[1:]
     else:
         rows = lines
 
-    data = []
-    for line in rows:
-        toks = re.split(r'\s+', line.strip())
-        nums = [float(t) for t in toks if is_float(t)]
-        if nums:
-            data.append(nums)
-
-    if not data:
+    try:
+        # rows are already comment-free, so np.loadtxt can parse them in C
+        data = np.loadtxt(rows, dtype=np.float64, ndmin=2) if rows else []
+    except ValueError:
+        # ragged/garbled rows: keep the numeric tokens of each line
+        data = []
+        for line in rows:
+            nums = floats(line.split())
+            if nums:
+                data.append(nums)
+
+    if len(data) == 0:
         sys.exit(f"ERROR: no numeric rows found in {src}")
 
     # If we have a header, try to map columns by name; else, take first 3 numbers.
     f_idx = r_idx = i_idx = None
     if header:
-        lname = [h.lower() for h in header]
-        # candidate lists
-        f_cands = ['frequency', 'freq', 'f']
-        r_cands = ['real(v(out))', 're:re', 're', 'real']
-        i_cands = ['imag(v(out))', 'im:im', 'im', 'imag']
-        for idx, h in enumerate(lname):
-            if f_idx is None and any(c == h for c in f_cands): f_idx = idx
-            if r_idx is None and any(c == h for c in r_cands): r_idx = idx
-            if i_idx is None and any(c == h for c in i_cands): i_idx = idx
-
-    out_lines = ["frequency re im"]
+        for idx, h in enumerate(h.lower() for h in header):
+            if f_idx is None and h in F_CANDS: f_idx = idx
+            if r_idx is None and h in R_CANDS: r_idx = idx
+            if i_idx is None and h in I_CANDS: i_idx = idx
+            if None not in (f_idx, r_idx, i_idx): break
+
     if f_idx is not None and r_idx is not None and i_idx is not None:
-        for row in data:
-            # guard for ragged rows
-            if max(f_idx, r_idx, i_idx) >= len(row): continue
-            out_lines.append(f"{row[f_idx]} {row[r_idx]} {row[i_idx]}")
+        sel = [f_idx, r_idx, i_idx]
     else:
         # fallback: use first three numbers in each row
-        for row in data:
-            if len(row) < 3: continue
-            out_lines.append(f"{row[0]} {row[1]} {row[2]}")
+        sel = [0, 1, 2]
+    need = max(sel) + 1
+    if isinstance(data, np.ndarray):
+        out = data[:, sel] if data.shape[1] >= need else np.empty((0, 3))
+    else:
+        # guard for ragged rows
+        out = np.array([[row[j] for j in sel] for row in data if len(row) >= need],
+                       dtype=np.float64).reshape(-1, 3)
 
     dst.parent.mkdir(parents=True, exist_ok=True)
-    dst.write_text("\n".join(out_lines))
-    print(f"Wrote {dst} ({len(out_lines)-1} rows)")
+    with open(dst, "w") as fh:
+        fh.write("frequency re im\n")
+        np.savetxt(fh, out, fmt="%.17g")  # %.17g round-trips float64 exactly
+    print(f"Wrote {dst} ({len(out)} rows)")
 
 if __name__ == "__main__":
     main()